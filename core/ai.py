@@ -1,9 +1,15 @@
 import json
 import os
+import time
+import asyncio
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
-from core.client import client
+from core.client import client, MODEL
+from core import metrics
+from core.logger import get_logger, ctx
+
+log = get_logger("ai")
 
 # Load API Key
 load_dotenv()
@@ -14,6 +20,35 @@ if not API_KEY:
 
 client = genai.Client(api_key=API_KEY)
 
+# --- DIALECT REGISTRY ---
+# Order matters: it is the order blocks appear in the prompt and the response.
+DIALECTS = ["hokkien", "cantonese", "hakka", "hainan", "malay", "kelate"]
+
+DIALECT_GUIDES = {
+    "hokkien": "**Hokkien:** Penang/Northern Style.",
+    "cantonese": "**Cantonese:** Hong Kong/Ipoh Style.",
+    "hakka": "**Hakka:** Malaysian Hakka.",
+    "hainan": "**Hainan:** Standard Hainanese.",
+    "malay": "**Malay:** Standard Malay.",
+    "kelate": "**Kelate:** Kelantan Malay Dialect.",
+}
+
+# Chinese dialects carry Hanzi, Malay dialects carry Latin script
+DIALECT_SCHEMAS = {
+    "hokkien": '{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+    "cantonese": '{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+    "hakka": '{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+    "hainan": '{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+    "malay": '{ "script": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+    "kelate": '{ "script": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }',
+}
+
+def _dialect_rules(dialects):
+    return "\n".join(f"    - {DIALECT_GUIDES[d]}" for d in dialects)
+
+def _dialect_schema(dialects):
+    return ",\n".join(f'        "{d}": {DIALECT_SCHEMAS[d]}' for d in dialects)
+
 # --- MAIN TRANSLATION PROMPT ---
 ONE_SHOT_PROMPT = """
 You are the VerbaBridge Omni-Translator.
@@ -74,13 +109,8 @@ Input: "{text}"
     - **520**: "Wo Ai Ni" (I Love You).
 
 6.  **MANDATORY DIALECT MAPPING:**
-    - You **MUST** provide translations for ALL 6 dialects below.
-    - **Hokkien:** Penang/Northern Style.
-    - **Cantonese:** Hong Kong/Ipoh Style.
-    - **Hakka:** Malaysian Hakka.
-    - **Hainan:** Standard Hainanese.
-    - **Malay:** Standard Malay.
-    - **Kelate:** Kelantan Malay Dialect.
+    - You **MUST** provide translations for ALL {dialect_count} dialects below, and **ONLY** these.
+{dialect_rules}
 
 ### 📝 OUTPUT REQUIREMENTS:
 - If multiple meanings exist (Ambiguity), generate a separate result object for EACH one.
@@ -95,48 +125,118 @@ OUTPUT STRICT JSON:
       "title": "Short Title (e.g. 'Gen Z Slang: Cap')",
       "description": "Means 'Lie' or 'False'. Used to call someone out.",
       "translations": {{
-        "hokkien": {{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }},
-        "cantonese": {{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }},
-        "hakka": {{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }},
-        "hainan": {{ "hanzi": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }},
-        "malay": {{ "script": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }},
-        "kelate": {{ "script": "...", "romanization": "...", "english_meaning": "...", "tone": "..." }}
+{dialect_schema}
       }}
     }}
   ]
 }}
 """ 
 
-def generate_translations(text):
-    print(f"🧠 Asking Gemini: '{text}'")
+# --- DIALECT TOP-UP PROMPT ---
+# Used when the senses are already cached and only some dialects are missing.
+# The model must NOT re-analyse the word; it only fills in the requested blocks.
+FILL_DIALECTS_PROMPT = """
+You are the VerbaBridge Omni-Translator.
+
+Input: "{text}"
+
+The meanings of this input have ALREADY been decided. Do NOT add, remove or reorder them:
+{senses}
+
+### 🗺️ DIALECT MAPPING:
+For EACH meaning above (same order), provide translations for ONLY these {dialect_count} dialects:
+{dialect_rules}
+
+OUTPUT STRICT JSON:
+{{
+  "results": [
+    {{
+      "translations": {{
+{dialect_schema}
+      }}
+    }}
+  ]
+}}
+"""
+
+async def _generate_json(prompt, kind, input_size=0):
+    # Async client: cancelling the awaiting task aborts the upstream HTTP call
+    start = time.perf_counter()
     try:
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
-            contents=ONE_SHOT_PROMPT.format(text=text),
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.6, # Balanced creativity
-                safety_settings=[
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HATE_SPEECH",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_DANGEROUS_CONTENT",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                        threshold="BLOCK_NONE"
-                    ),
-                    types.SafetySetting(
-                        category="HARM_CATEGORY_HARASSMENT",
-                        threshold="BLOCK_NONE"
-                    )
-                ]
-            )
+        response = await _generate(prompt)
+    except asyncio.CancelledError:
+        metrics.record_upstream(MODEL, kind, latency=time.perf_counter() - start, input_size=input_size, cancelled=True)
+        raise
+    except Exception:
+        metrics.record_upstream(MODEL, kind, latency=time.perf_counter() - start, input_size=input_size, ok=False)
+        raise
+    metrics.record_upstream(MODEL, kind, response, latency=time.perf_counter() - start, input_size=input_size)
+    return json.loads(response.text)
+
+async def _generate(prompt):
+    return await client.aio.models.generate_content(
+        model=MODEL,
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            temperature=0.6, # Balanced creativity
+            safety_settings=[
+                types.SafetySetting(
+                    category="HARM_CATEGORY_HATE_SPEECH",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_DANGEROUS_CONTENT",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_SEXUALLY_EXPLICIT",
+                    threshold="BLOCK_NONE"
+                ),
+                types.SafetySetting(
+                    category="HARM_CATEGORY_HARASSMENT",
+                    threshold="BLOCK_NONE"
+                )
+            ]
         )
-        return json.loads(response.text)
+    )
+
+async def generate_translations(text, dialects=None):
+    """
+    Full analysis (senses + translations).
+    Only the requested dialect blocks are generated, since output tokens dominate latency.
+    """
+    dialects = dialects or DIALECTS
+    log.info("🧠 Asking Gemini", extra=ctx(text=text, dialects=",".join(dialects)))
+    try:
+        return await _generate_json(ONE_SHOT_PROMPT.format(
+            text=text,
+            dialect_count=len(dialects),
+            dialect_rules=_dialect_rules(dialects),
+            dialect_schema=_dialect_schema(dialects),
+        ), "generate", input_size=len(text))
+    except Exception as e:
+        log.error("❌ AI Error", extra=ctx(error=e))
+        return {"is_ambiguous": False, "results": []}
+
+async def fill_translations(text, results, dialects):
+    """
+    Top-up call: generates ONLY the missing dialect blocks for senses we already have.
+    Returns a list of translation dicts aligned (by index) with `results`.
+    """
+    log.info("🧩 Asking Gemini for missing dialects", extra=ctx(text=text, dialects=",".join(dialects)))
+    senses = "\n".join(
+        f"{i + 1}. {r.get('title', '')}: {r.get('description', '')}" for i, r in enumerate(results)
+    )
+    try:
+        data = await _generate_json(FILL_DIALECTS_PROMPT.format(
+            text=text,
+            senses=senses,
+            dialect_count=len(dialects),
+            dialect_rules=_dialect_rules(dialects),
+            dialect_schema=_dialect_schema(dialects),
+        ), "top_up", input_size=len(text))
+        return [r.get("translations", {}) for r in data.get("results", [])]
     except Exception as e:
-        print(f"❌ AI Error: {e}")
-        return {"is_ambiguous": False, "results": []}
\ No newline at end of file
+        log.error("❌ AI Error", extra=ctx(error=e))
+        return []
@@ -1,10 +1,15 @@
 import os
 import json
 import hashlib
+from collections import OrderedDict
 from core.client import CACHE_DIR
+from core.remote_cache import RemoteCache
+from core.logger import get_logger, ctx, SAMPLE_RATE
+
+log = get_logger("cache")
 
 class FileSystemCache:
-    def __init__(self, cache_file=None):
+    def __init__(self, cache_file=None, subdir=None, remote=None, memory_limit=1024):
         """
         Initialize the cache system.
         
@@ -14,14 +19,27 @@ class FileSystemCache:
                   Used for: OCR translations (fast, small lookups).
                 - If None, runs in DIRECTORY MODE (Hash -> File).
                   Used for: Main translation system (complex JSON objects).
+            subdir (str, optional):
+                Directory mode only: keeps this cache in CACHE_DIR/<subdir>/ so its
+                keys never collide with the main translation cache (e.g. 'style').
+            remote (RemoteCache, optional):
+                Shared tier checked after local memory + disk.
+                Defaults to RemoteCache.from_env() (None when REDIS_URL is unset).
+            memory_limit (int): 
+                Max entries kept in the in-memory LRU (directory mode).
         """
-        # Ensure base cache directory exists
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR)
-            print(f"📁 Created cache directory: {CACHE_DIR}/")
+        # Ensure cache directory exists
+        self.cache_dir = os.path.join(CACHE_DIR, subdir) if subdir else CACHE_DIR
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            log.info(f"📁 Created cache directory: {self.cache_dir}/")
 
         self.cache_file = None
         self.memory_cache = {}
+        self.memory_limit = memory_limit
+
+        namespace = os.path.splitext(cache_file)[0] if cache_file else (subdir or "translations")
+        self.remote = remote if remote is not None else RemoteCache.from_env(namespace)
 
         if cache_file:
             # --- MODE A: SINGLE FILE (OCR) ---
@@ -31,22 +49,66 @@ class FileSystemCache:
         else:
             # --- MODE B: DIRECTORY HASH (Main System) ---
             self.mode = "directory"
+            # Hot entries stay in RAM (LRU) so repeats skip the disk read
+            self.memory_cache = OrderedDict()
 
     # --- SHARED METHODS ---
+    # Read order: local memory -> local disk -> remote (then backfill local)
     
-    def get(self, key):
+    async def get(self, key):
+        value = self._get_local(key)
+        if value is None and self.remote:
+            value = await self.remote.get(self._remote_key(key))
+            if value is not None:
+                log.info("🌐 REMOTE CACHE HIT", extra=ctx(sample=SAMPLE_RATE))
+                self._set_local(key, value)
+        return value
+
+    async def set(self, key, value):
+        self._set_local(key, value)
+        if self.remote:
+            self.remote.set(self._remote_key(key), value)  # Background write
+
+    def peek(self, key):
+        """Local tiers only (memory, disk): never waits on the remote tier."""
+        return self._get_local(key)
+
+    # --- LOCAL TIER ---
+
+    def _get_local(self, key):
         if self.mode == "single_file":
             return self.memory_cache.get(key)
-        else:
-            return self._get_from_dir(key)
 
-    def set(self, key, value):
+        file_hash = self._get_hash(key)
+        if file_hash in self.memory_cache:
+            self.memory_cache.move_to_end(file_hash)
+            return self.memory_cache[file_hash]
+
+        value = self._get_from_dir(key)
+        if value is not None:
+            self._remember(file_hash, value)
+        return value
+
+    def _set_local(self, key, value):
         if self.mode == "single_file":
             self.memory_cache[key] = value
             self._save_single_file()
         else:
+            self._remember(self._get_hash(key), value)
             self._save_to_dir(key, value)
 
+    def _remember(self, file_hash, value):
+        self.memory_cache[file_hash] = value
+        self.memory_cache.move_to_end(file_hash)
+        while len(self.memory_cache) > self.memory_limit:
+            self.memory_cache.popitem(last=False)
+
+    def _remote_key(self, key):
+        # Directory mode normalizes text; single-file keys are used verbatim
+        if self.mode == "directory":
+            return self._get_hash(key)
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
     # --- DIRECTORY MODE HELPERS (Original Logic) ---
 
     def _get_hash(self, text):
@@ -55,26 +117,26 @@ class FileSystemCache:
 
     def _get_from_dir(self, text):
         file_hash = self._get_hash(text)
-        file_path = os.path.join(CACHE_DIR, f"{file_hash}.json")
+        file_path = os.path.join(self.cache_dir, f"{file_hash}.json")
         
         if os.path.exists(file_path):
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except Exception as e:
-                print(f"⚠ Cache Read Error: {e}")
+                log.warning("⚠ Cache Read Error", extra=ctx(error=e))
                 return None
         return None
 
     def _save_to_dir(self, text, data):
         file_hash = self._get_hash(text)
-        file_path = os.path.join(CACHE_DIR, f"{file_hash}.json")
+        file_path = os.path.join(self.cache_dir, f"{file_hash}.json")
         
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            print(f"⚠ Cache Write Error: {e}")
+            log.warning("⚠ Cache Write Error", extra=ctx(error=e))
 
     # --- SINGLE FILE MODE HELPERS ---
 
@@ -84,7 +146,7 @@ class FileSystemCache:
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
                     self.memory_cache = json.load(f)
             except Exception as e:
-                print(f"⚠ Map Cache Read Error: {e}")
+                log.warning("⚠ Map Cache Read Error", extra=ctx(error=e))
                 self.memory_cache = {}
         else:
             self.memory_cache = {}
@@ -94,4 +156,4 @@ class FileSystemCache:
             with open(self.cache_file, 'w', encoding='utf-8') as f:
                 json.dump(self.memory_cache, f, indent=2, ensure_ascii=False)
         except Exception as e:
-            print(f"⚠ Map Cache Write Error: {e}")
\ No newline at end of file
+            log.warning("⚠ Map Cache Write Error", extra=ctx(error=e))
\ No newline at end of file
@@ -1,18 +1,28 @@
 import os
 from google import genai
 from dotenv import load_dotenv
+from core.logger import get_logger
+
+log = get_logger("client")
 
 # --- 1. CONFIGURATION SETUP ---
 load_dotenv()
 
 API_KEY = os.getenv("GEMINI_API_KEY")
 if not API_KEY:
-    # Print warning but don't crash immediately (allows debugging)
-    print("⚠ WARNING: API Key not found in .env. Please set GEMINI_API_KEY.")
+    # Log warning but don't crash immediately (allows debugging)
+    log.warning("⚠ API Key not found in .env. Please set GEMINI_API_KEY.")
+
+# Single place to switch the Gemini model (also used as a metrics label)
+MODEL = "gemini-3-flash-preview"
 
 # Define the Cache Directory here so it's accessible globally
 CACHE_DIR = "cache_data"
 
+# Optional shared cache tier (multi-node). Unset = local-only caching.
+# e.g. REDIS_URL=redis://cache-host:6379/0
+REDIS_URL = os.getenv("REDIS_URL")
+
 # --- 2. INITIALIZE CLIENT ---
 # This 'client' object will be imported by ai.py, style.py, etc.
 client = genai.Client(api_key=API_KEY)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import gzip
+import json
+import hashlib
+from fastapi import Request
+from fastapi.responses import Response
+from core.logger import get_logger
+
+log = get_logger("http_cache")
+
+# Brotli is optional: without it we still serve gzip + identity variants.
+try:
+    import brotli
+except ImportError:
+    log.warning("⚠ 'brotli' library not found. Serving gzip only. Install with: pip install brotli")
+    brotli = None
+
+# --- CACHE POLICIES ---
+# Dashboard: always revalidate (cheap 304s), so a redeploy is picked up instantly.
+DASHBOARD_CACHE_CONTROL = "no-cache"
+# Translations: stable once cached server-side, so edge caches may keep them for a day.
+TRANSLATION_CACHE_CONTROL = "public, max-age=86400"
+
+
+def make_etag(body, suffix=""):
+    """Strong ETag from the exact response bytes (plus encoding suffix for variants)."""
+    digest = hashlib.sha256(body).hexdigest()[:32]
+    return f'"{digest}{suffix}"'
+
+
+def etag_matches(request, etag):
+    """
+    Checks the If-None-Match header against our ETag.
+    Handles lists ("a", "b"), the '*' wildcard and weak validators (W/"a"),
+    using weak comparison as If-None-Match requires.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def _accepted_encodings(request):
+    """Parses Accept-Encoding into a set, dropping anything marked q=0."""
+    accepted = set()
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = params.strip().replace(" ", "")
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def not_modified(etag, cache_control, extra_headers=None):
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if extra_headers:
+        headers.update(extra_headers)
+    return Response(status_code=304, headers=headers)
+
+
+class StaticAsset:
+    """
+    A file loaded ONCE at startup and kept in memory with precompressed variants.
+
+    Variants:
+        - identity (raw bytes)
+        - gzip (always)
+        - br (if the 'brotli' library is installed)
+    Each variant gets its own strong ETag, as required by RFC 9110.
+    """
+
+    def __init__(self, path, media_type="text/html; charset=utf-8", cache_control=DASHBOARD_CACHE_CONTROL):
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.variants = {}
+
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        self.variants["identity"] = (raw, make_etag(raw))
+        self.variants["gzip"] = (gzip.compress(raw, compresslevel=9, mtime=0), make_etag(raw, "-gzip"))
+        if brotli:
+            self.variants["br"] = (brotli.compress(raw, quality=11), make_etag(raw, "-br"))
+
+    def _pick_variant(self, request):
+        accepted = _accepted_encodings(request)
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, request):
+        encoding = self._pick_variant(request)
+        body, etag = self.variants[encoding]
+
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if etag_matches(request, etag):
+            return not_modified(etag, self.cache_control, headers)
+
+        headers.update({"ETag": etag, "Cache-Control": self.cache_control})
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def cacheable_json(request: Request, payload, cache_control=TRANSLATION_CACHE_CONTROL, volatile_keys=("source",)):
+    """
+    Serializes payload deterministically, tags it with a weak ETag and
+    answers 304 Not Modified when the client (or an edge cache) already has it.
+
+    Keys in volatile_keys (e.g. "source": "gemini" vs "cache") are left out of
+    the ETag so the first and repeat responses validate against each other.
+    Such responses are semantically (not byte-for-byte) equal, hence W/"...".
+    """
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    stable = {k: v for k, v in payload.items() if k not in volatile_keys}
+    etag = "W/" + make_etag(json.dumps(stable, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control},
+    )
@@ -0,0 +1,154 @@
+import json
+import asyncio
+from collections import OrderedDict
+from fastapi import WebSocket, WebSocketDisconnect
+from core.logger import get_logger, ctx
+from core import metrics
+
+log = get_logger("live")
+
+# --- TUNING ---
+DEBOUNCE_SECONDS = 0.35   # Typing pause before we spend an LLM call
+HISTORY_LIMIT = 64        # Settled phrases remembered per client (backspacing = instant)
+MODES = ("translate", "style")
+
+
+def _request_key(msg):
+    """Two messages with the same key would produce the same answer."""
+    return json.dumps([
+        msg.get("mode", "translate"),
+        msg["text"].strip().lower(),
+        msg.get("style"),
+        sorted(msg.get("dialects") or []),
+    ])
+
+
+class LiveSession:
+    """
+    One live-typing session per WebSocket client.
+
+    Protocol (JSON text frames):
+        client -> {"text": "...", "mode": "translate"|"style", "style": "...", "dialects": [...]}
+        server -> {"seq": n, "text": "...", "mode": "...", ...payload}
+
+    Every keystroke bumps `seq` and supersedes the previous one: its debounce
+    timer AND any in-flight upstream call are cancelled. Answers already in
+    this session's history or the local cache are sent immediately; only a
+    settled phrase (no new input for DEBOUNCE_SECONDS) reaches the remote
+    cache or Gemini.
+    Clients should ignore replies whose seq is older than the last one shown.
+    """
+
+    def __init__(self, websocket: WebSocket, resolve, is_cached, debounce=DEBOUNCE_SECONDS):
+        """
+        Args:
+            resolve (async callable): msg -> response payload (may call Gemini).
+            is_cached (callable): msg -> True if resolve() would answer from the local cache.
+                Called on every keystroke, so it must be cheap (no network).
+        """
+        self.ws = websocket
+        self.resolve = resolve
+        self.is_cached = is_cached
+        self.debounce = debounce
+
+        self.seq = 0
+        self.pending = None
+        self.history = OrderedDict()
+        self.stats = {"messages": 0, "instant": 0, "upstream": 0, "superseded": 0}
+
+    async def run(self):
+        await self.ws.accept()
+        try:
+            while True:
+                raw = await self.ws.receive_text()
+                await self._handle(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._cancel_pending()
+            log.info("🔌 Live Session Closed", extra=ctx(**self.stats))
+
+    # --- MESSAGE HANDLING ---
+
+    async def _handle(self, raw):
+        self.seq += 1
+        seq = self.seq
+        self.stats["messages"] += 1
+
+        # Newer input always wins: drop the timer / upstream call of the previous one
+        self._cancel_pending()
+
+        try:
+            msg = json.loads(raw)
+            if not isinstance(msg, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            return await self._send(seq, {"status": "error", "message": f"Invalid message: {e}"})
+
+        msg["text"] = str(msg.get("text") or "").strip()
+        msg["mode"] = msg.get("mode", "translate")
+        if msg["mode"] not in MODES:
+            return await self._send(seq, {"status": "error", "message": f"Unknown mode. Choose from: {', '.join(MODES)}"})
+        dialects = msg.get("dialects")
+        if dialects is not None and not (isinstance(dialects, list) and all(isinstance(d, str) for d in dialects)):
+            return await self._send(seq, {"status": "error", "message": "'dialects' must be a list of strings"})
+        if msg["mode"] == "style":
+            style = msg.setdefault("style", "Gen Alpha")
+            if not isinstance(style, str) or not style.strip():
+                return await self._send(seq, {"status": "error", "message": "'style' must be a non-empty string"})
+            msg["style"] = style.strip()
+        if not msg["text"]:
+            return await self._send(seq, {"status": "idle"}, msg)
+
+        key = _request_key(msg)
+
+        # A. Session History (this client already settled on this phrase)
+        if key in self.history:
+            self.history.move_to_end(key)
+            self.stats["instant"] += 1
+            metrics.record_cache("session", msg.get("style") if msg["mode"] == "style" else None)
+            return await self._send(seq, {**self.history[key], "source": "session"}, msg)
+
+        # B. Local Cache (another client / earlier request paid for it)
+        if self.is_cached(msg):
+            self.stats["instant"] += 1
+            payload = await self.resolve(msg)
+            self._remember(key, payload)
+            return await self._send(seq, payload, msg)
+
+        # C. Debounce, then ask Gemini (cancellable)
+        self.pending = asyncio.create_task(self._settle(seq, key, msg))
+
+    async def _settle(self, seq, key, msg):
+        await asyncio.sleep(self.debounce)
+
+        self.stats["upstream"] += 1
+        payload = await self.resolve(msg)
+        self._remember(key, payload)
+
+        if seq == self.seq:
+            # Shielded so a cancel arriving mid-send can't cut a frame in half
+            await asyncio.shield(self._send(seq, payload, msg))
+
+    def _cancel_pending(self):
+        if self.pending and not self.pending.done():
+            self.pending.cancel()
+            self.stats["superseded"] += 1
+        self.pending = None
+
+    def _remember(self, key, payload):
+        if payload.get("status") == "error" or "error" in payload:
+            return
+        self.history[key] = payload
+        while len(self.history) > HISTORY_LIMIT:
+            self.history.popitem(last=False)
+
+    async def _send(self, seq, payload, msg=None):
+        frame = {"seq": seq}
+        if msg:
+            frame.update({"text": msg["text"], "mode": msg["mode"]})
+        frame.update(payload)
+        try:
+            await self.ws.send_text(json.dumps(frame, ensure_ascii=False))
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # Client already gone; run() will clean up
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import queue
+import copy
+import random
+import atexit
+import traceback
+import logging
+import logging.handlers
+import contextvars
+from dotenv import load_dotenv
+
+# --- CONFIGURATION ---
+# Loaded here too: this module is imported before core/client.py reads .env
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")                   # "json" (collectors) or "text" (local dev)
+SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))        # Share of high-volume lines kept
+MAX_FIELD_CHARS = 120       # User text / AI responses are cut to this, never echoed in full
+MAX_MESSAGE_CHARS = 500     # Safety net for the message itself
+MAX_TRACEBACK_CHARS = 1500  # Tracebacks keep their TAIL (the actual exception line)
+QUEUE_SIZE = 10000          # When full we DROP lines rather than block the event loop
+
+# Set per request by the HTTP middleware in main.py; "-" outside a request
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+_listener = None
+
+
+def truncate(value, limit=MAX_FIELD_CHARS):
+    """Shortens long payloads: 'abc…(+1200 chars)'."""
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(+{len(text) - limit} chars)"
+
+
+def truncate_tail(value, limit=MAX_TRACEBACK_CHARS):
+    """Like truncate(), but keeps the END: '(1200 chars)…ValueError: boom'."""
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"({len(text) - limit} chars)…{text[-limit:]}"
+
+
+def ctx(sample=None, **fields):
+    """
+    Builds the `extra=` dict for a structured log line.
+
+    Usage:
+        log.info("🧠 Asking Gemini", extra=ctx(text=text, dialects=dialects))
+        log.info("⚡ CACHE HIT", extra=ctx(sample=SAMPLE_RATE))
+    """
+    extra = {"fields": fields}
+    if sample is not None:
+        extra["sample_rate"] = sample
+    return extra
+
+
+# --- FILTERS ---
+
+class _RequestContextFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _SamplingFilter(logging.Filter):
+    """Keeps roughly `sample_rate` of lines that opt in. Warnings and errors are never sampled."""
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", None)
+        if rate is None or record.levelno >= logging.WARNING:
+            return True
+        return random.random() < rate
+
+
+# --- FORMATTERS ---
+
+def _clean_fields(record):
+    fields = getattr(record, "fields", None) or {}
+    return {
+        k: v if isinstance(v, (int, float, bool)) or v is None else truncate(v)
+        for k, v in fields.items()
+    }
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": truncate(record.getMessage(), MAX_MESSAGE_CHARS),
+        }
+        entry.update(_clean_fields(record))
+        if record.exc_text:
+            entry["exc"] = truncate_tail(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{record.levelname:<7} [{getattr(record, 'request_id', '-')}] {truncate(record.getMessage(), MAX_MESSAGE_CHARS)}"
+        fields = _clean_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v!r}" for k, v in fields.items())
+        if record.exc_text:
+            line += "\n" + truncate_tail(record.exc_text)
+        return line
+
+
+# --- NON-BLOCKING HANDLER ---
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    The request path only does a put_nowait(); the actual stdout write
+    happens on the QueueListener's background thread. If the collector is
+    so slow that the queue fills up, lines are dropped (and counted)
+    instead of backing up into request latency.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        """
+        Unlike the stdlib version, does NOT bake the traceback into `msg`:
+        it is rendered into `exc_text` (traceback objects shouldn't cross
+        threads) so our formatters can put it in its own field.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = "".join(traceback.format_exception(*record.exc_info)).rstrip()
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def setup_logging():
+    """Idempotent. Wires the 'verbabridge' logger to a queue drained by a background thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(_JsonFormatter() if LOG_FORMAT == "json" else _TextFormatter())
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    handler = _DroppingQueueHandler(log_queue)
+    handler.addFilter(_RequestContextFilter())
+    handler.addFilter(_SamplingFilter())
+
+    root = logging.getLogger("verbabridge")
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+    root.propagate = False
+
+    # uvicorn's loggers write to stdout on the event loop: send them through the same queue.
+    # Its per-request access line is superseded by the middleware's sampled "✅ Request Done"
+    # (which carries request_id + latency), so only access warnings get through.
+    for name in ("uvicorn", "uvicorn.access"):
+        server_log = logging.getLogger(name)
+        server_log.handlers = [handler]
+        server_log.propagate = False
+    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def dropped_lines():
+    """Lines dropped because the queue was full (since process start)."""
+    return _DroppingQueueHandler.dropped
+
+
+def get_logger(name):
+    """Returns a child of the 'verbabridge' logger, e.g. get_logger('ai') -> 'verbabridge.ai'."""
+    setup_logging()
+    return logging.getLogger("verbabridge").getChild(name)
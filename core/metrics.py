@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from core.logger import get_logger, ctx, dropped_lines
+
+log = get_logger("metrics")
+
+# --- PRICING (USD per 1M tokens) ---
+# Set these in .env to match your Gemini billing; 0 = cost not estimated.
+PRICE_INPUT = float(os.getenv("PRICE_INPUT_PER_MTOK", "0"))
+PRICE_OUTPUT = float(os.getenv("PRICE_OUTPUT_PER_MTOK", "0"))     # Also applied to "thinking" tokens
+PRICE_CACHED = float(os.getenv("PRICE_CACHED_PER_MTOK", "0"))
+SUMMARY_SECONDS = int(os.getenv("METRICS_SUMMARY_SECONDS", "300"))  # 0 = no periodic summary
+
+# Set per request by main.py (HTTP middleware / WebSocket handler)
+endpoint_var = contextvars.ContextVar("endpoint", default="-")
+
+# Input size buckets: chars of USER text (not the prompt template), or kilopixels for images
+SIZE_BUCKETS = [(16, "xs"), (64, "s"), (256, "m"), (1024, "l")]
+
+_lock = threading.Lock()   # Recorders run on the event loop today; keeps counters safe if one moves to a thread
+_upstream = {}             # (endpoint, kind, style, model, size) -> counters
+_requests = {}             # (endpoint, style, cache outcome) -> count
+_started = time.time()
+
+
+def size_bucket(size):
+    for limit, name in SIZE_BUCKETS:
+        if size <= limit:
+            return name
+    return "xl"
+
+
+def _usage(response):
+    """Reads usage_metadata defensively (fields are None when not applicable)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return 0, 0, 0, 0
+    return (
+        usage.prompt_token_count or 0,
+        usage.candidates_token_count or 0,
+        usage.thoughts_token_count or 0,
+        usage.cached_content_token_count or 0,
+    )
+
+
+# Call kinds, so prompt variants can be compared (e.g. a dialect top-up vs a full generation)
+KINDS = ("generate", "top_up", "style", "vision")
+
+
+def record_upstream(model, kind, response=None, latency=0.0, attempts=1, style=None, input_size=0, ok=True, cancelled=False):
+    """
+    Records ONE logical upstream call (all of its retry attempts).
+
+    Args:
+        kind (str): Which prompt was sent, one of KINDS.
+        response: The Gemini response (None if every attempt failed).
+        latency (float): Seconds from the first attempt until success, failure or cancellation
+            (so retries and their back-off count too).
+        attempts (int): Total attempts made, so retries = attempts - 1.
+        input_size (int): Text length in chars, or kilopixels for images.
+        cancelled (bool): The caller went away mid-call (superseded keystroke, dropped client).
+            Counted apart from errors; tokens may still have been billed.
+    """
+    prompt, output, thoughts, cached = _usage(response)
+    key = (endpoint_var.get(), kind, style or "-", model, size_bucket(input_size))
+
+    with _lock:
+        stats = _upstream.setdefault(key, {
+            "calls": 0, "errors": 0, "cancelled": 0, "retries": 0,
+            "prompt_tokens": 0, "output_tokens": 0, "thoughts_tokens": 0, "cached_tokens": 0,
+            "input_size": 0, "latency_s": 0.0, "latency_max_s": 0.0,
+        })
+        stats["calls"] += 1
+        stats["errors"] += 0 if ok or cancelled else 1
+        stats["cancelled"] += 1 if cancelled else 0
+        stats["retries"] += max(0, attempts - 1)
+        stats["prompt_tokens"] += prompt
+        stats["output_tokens"] += output
+        stats["thoughts_tokens"] += thoughts
+        stats["cached_tokens"] += cached
+        stats["input_size"] += input_size
+        stats["latency_s"] += latency
+        stats["latency_max_s"] = max(stats["latency_max_s"], latency)
+
+
+def record_cache(outcome, style=None):
+    """Request-level cache outcome: 'hit', 'partial', 'miss' (or 'session' for live typing)."""
+    key = (endpoint_var.get(), style or "-", outcome)
+    with _lock:
+        _requests[key] = _requests.get(key, 0) + 1
+
+
+def _cost(stats):
+    # Cached prompt tokens are billed at the cached rate instead of the input rate
+    fresh_prompt = stats["prompt_tokens"] - stats["cached_tokens"]
+    return (
+        fresh_prompt * PRICE_INPUT
+        + stats["cached_tokens"] * PRICE_CACHED
+        + (stats["output_tokens"] + stats["thoughts_tokens"]) * PRICE_OUTPUT
+    ) / 1_000_000
+
+
+def snapshot():
+    """Aggregates since process start, shaped for JSON."""
+    with _lock:
+        upstream = [(k, dict(v)) for k, v in _upstream.items()]
+        requests = list(_requests.items())
+
+    rows = []
+    totals = {"calls": 0, "errors": 0, "cancelled": 0, "retries": 0, "prompt_tokens": 0, "output_tokens": 0,
+              "thoughts_tokens": 0, "cached_tokens": 0, "est_cost_usd": 0.0}
+    for (endpoint, kind, style, model, size), stats in sorted(upstream):
+        cost = _cost(stats)
+        rows.append({
+            "endpoint": endpoint, "kind": kind, "style": style, "model": model, "size_bucket": size,
+            "calls": stats["calls"], "errors": stats["errors"], "cancelled": stats["cancelled"],
+            "retries": stats["retries"],
+            "prompt_tokens": stats["prompt_tokens"], "output_tokens": stats["output_tokens"],
+            "thoughts_tokens": stats["thoughts_tokens"], "cached_tokens": stats["cached_tokens"],
+            "avg_input_size": round(stats["input_size"] / stats["calls"], 1),
+            "latency_ms_avg": round(stats["latency_s"] / stats["calls"] * 1000, 1),
+            "latency_ms_max": round(stats["latency_max_s"] * 1000, 1),
+            "est_cost_usd": round(cost, 6),
+        })
+        for field in totals:
+            totals[field] += cost if field == "est_cost_usd" else stats[field]
+    totals["est_cost_usd"] = round(totals["est_cost_usd"], 6)
+
+    served = sum(count for _, count in requests)
+    free = sum(count for (_, _, outcome), count in requests if outcome in ("hit", "session"))
+    return {
+        "uptime_seconds": round(time.time() - _started),
+        "totals": totals,
+        "cache_hit_rate": round(free / served, 3) if served else None,
+        "log_lines_dropped": dropped_lines(),
+        "upstream": rows,
+        "requests": [
+            {"endpoint": endpoint, "style": style, "cache": outcome, "count": count}
+            for (endpoint, style, outcome), count in sorted(requests)
+        ],
+    }
+
+
+async def summary_loop(interval=SUMMARY_SECONDS):
+    """Logs a one-line spend summary every `interval` seconds (runs for the app lifetime)."""
+    while True:
+        await asyncio.sleep(interval)
+        snap = snapshot()
+        log.info("📊 Usage Summary", extra=ctx(
+            uptime_s=snap["uptime_seconds"],
+            cache_hit_rate=snap["cache_hit_rate"],
+            log_lines_dropped=snap["log_lines_dropped"],
+            **snap["totals"],
+        ))
@@ -1,5 +1,6 @@
 import json
 import io
+import asyncio
 import base64
 import time
 import numpy as np
@@ -8,8 +9,12 @@ import PIL.ImageDraw
 import PIL.ImageFont
 import PIL.ImageOps  # Crucial for phone photos
 from google.genai import types
-from core.client import client
+from core.client import client, MODEL
+from core import metrics
 from fastapi.concurrency import run_in_threadpool
+from core.logger import get_logger, ctx
+
+log = get_logger("ocr")
 
 # --- OCR PROMPT ---
 def GET_OCR_REMIX_PROMPT(target_style):
@@ -114,12 +119,14 @@ def _is_dark_color(color_tuple):
     brightness = (r * 299 + g * 587 + b * 114) / 1000
     return brightness < 128
 
-def _process_cloud_sync(image_bytes, target_style):
-    print(f"☁️ Processing {target_style} Remix (Gemini 3.0)...")
-    
+# --- PIPELINE STAGES ---
+# Each stage returns (value, error_dict) so a batch can report per-image failures.
+
+def _decode_image(image_bytes):
     # 1. LOAD & PREPARE IMAGE
     try:
         original = PIL.Image.open(io.BytesIO(image_bytes))
+        has_alpha = original.mode in ("RGBA", "LA", "PA") or "transparency" in original.info
         # FIX: Handle Phone Rotation (EXIF)
         try:
             img = PIL.ImageOps.exif_transpose(original).convert("RGBA")
@@ -129,32 +136,70 @@ def _process_cloud_sync(image_bytes, target_style):
         # Resize for speed (Critical for Hackathon WiFi)
         if img.width > 1024 or img.height > 1024:
             img.thumbnail((1024, 1024))
-            
-        width, height = img.size
+
+        upload = _encode_upload(img, has_alpha)
     except Exception as e:
-        return {"error": f"Invalid Image: {str(e)}"}
+        return None, {"error": f"Invalid Image: {str(e)}"}
+
+    return (img, upload), None
+
+def _encode_upload(img, has_alpha):
+    """
+    Encodes the copy sent to Gemini. Done here (threadpool) because handing
+    the SDK a PIL image makes it PNG-encode on the event loop.
+    Opaque images go as JPEG: far smaller and faster to encode.
+    """
+    buffered = io.BytesIO()
+    if has_alpha:
+        img.save(buffered, format="PNG")
+        mime_type = "image/png"
+    else:
+        img.convert("RGB").save(buffered, format="JPEG", quality=90)
+        mime_type = "image/jpeg"
+    return types.Part.from_bytes(data=buffered.getvalue(), mime_type=mime_type)
 
+async def _call_vision(img, upload, target_style):
+    # Async client: cancelling the awaiting task aborts the upstream request
+    # (and the retry loop), so a dropped batch stops spending tokens.
+    # `upload` is pre-encoded by _decode_image: only network I/O happens here.
     prompt = GET_OCR_REMIX_PROMPT(target_style)
     ai_response_text = None
 
     # 2. CALL GEMINI (Retry Logic)
     max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            # Note: Gemini 3.0 Preview handles images well now
-            response = client.models.generate_content(
-                model="gemini-3-flash-preview", 
-                contents=[img, prompt],
-                config=types.GenerateContentConfig(response_mime_type="application/json")
-            )
-            ai_response_text = response.text
-            break 
-        except Exception as e:
-            print(f"⚠️ Attempt {attempt+1} failed: {e}")
-            time.sleep(1)
+    response = None
+    attempt = 0
+    # Input size for images = kilopixels (tokens scale with resolution, not text)
+    kilopixels = img.width * img.height // 1000
+    start = time.perf_counter()  # Latency covers every attempt and back-off
+    try:
+        for attempt in range(max_retries):
+            try:
+                # Note: Gemini 3.0 Preview handles images well now
+                response = await client.aio.models.generate_content(
+                    model=MODEL, 
+                    contents=[upload, prompt],
+                    config=types.GenerateContentConfig(response_mime_type="application/json")
+                )
+                ai_response_text = response.text
+                break 
+            except Exception as e:
+                log.warning("⚠️ Gemini attempt failed", extra=ctx(attempt=attempt + 1, error=e))
+                await asyncio.sleep(1)
+    except asyncio.CancelledError:
+        metrics.record_upstream(
+            MODEL, "vision", latency=time.perf_counter() - start, attempts=attempt + 1, style=target_style,
+            input_size=kilopixels, cancelled=True,
+        )
+        raise
+
+    metrics.record_upstream(
+        MODEL, "vision", response, latency=time.perf_counter() - start, attempts=attempt + 1, style=target_style,
+        input_size=kilopixels, ok=bool(ai_response_text),
+    )
 
     if not ai_response_text:
-        return {"error": "AI Service Timeout (Google Busy)"}
+        return None, {"error": "AI Service Timeout (Google Busy)"}
 
     # 3. PARSE JSON
     try:
@@ -163,10 +208,14 @@ def _process_cloud_sync(image_bytes, target_style):
         items = data.get("items", []) if isinstance(data, dict) else data
         if not isinstance(items, list): items = []
     except Exception as json_err:
-        print(f"JSON Error: {json_err}")
-        return {"error": "Failed to parse AI response"}
+        log.error("❌ OCR JSON Error", extra=ctx(error=json_err, response=ai_response_text))
+        return None, {"error": "Failed to parse AI response"}
+
+    return items, None
 
+def _render_remix(img, items):
     # 4. VISUAL EDITING (The Polish)
+    width, height = img.size
     try:
         draw = PIL.ImageDraw.Draw(img)
         
@@ -235,4 +284,61 @@ def _process_cloud_sync(image_bytes, target_style):
         return {"error": f"Drawing Error: {str(draw_err)}"}
 
 async def process_image_remix(image_bytes, target_style="Gen Alpha"):
-    return await run_in_threadpool(_process_cloud_sync, image_bytes, target_style)
\ No newline at end of file
+    log.info("☁️ Processing Remix (Gemini 3.0)", extra=ctx(style=target_style, image_bytes=len(image_bytes)))
+
+    # CPU stages in the threadpool, network stage on the event loop
+    decoded, err = await run_in_threadpool(_decode_image, image_bytes)
+    if err: return err
+    img, upload = decoded
+
+    items, err = await _call_vision(img, upload, target_style)
+    if err: return err
+
+    return await run_in_threadpool(_render_remix, img, items)
+
+# --- BATCH PIPELINE ---
+# Stage locks let image k+1 DECODE while image k waits on the VISION call
+# and image k-1 RENDERS. Decode/render are CPU-bound (1 at a time each);
+# vision calls are network-bound, so several run concurrently.
+VISION_CONCURRENCY = 4
+
+async def process_images_remix(images, target_style="Gen Alpha", vision_concurrency=VISION_CONCURRENCY):
+    """
+    Async generator over a batch of images.
+
+    Args:
+        images (list[bytes]): Raw uploaded files.
+    Yields:
+        (index, result) tuples in COMPLETION order (not upload order).
+    """
+    log.info("☁️ Processing Batch Remix", extra=ctx(style=target_style, images=len(images)))
+
+    decode_lock = asyncio.Semaphore(1)
+    vision_slots = asyncio.Semaphore(vision_concurrency)
+    render_lock = asyncio.Semaphore(1)
+    # Bounds memory: never hold more decoded images than the pipeline can work on
+    in_flight = asyncio.Semaphore(vision_concurrency + 2)
+
+    async def run_one(index, image_bytes):
+        async with in_flight:
+            async with decode_lock:
+                decoded, err = await run_in_threadpool(_decode_image, image_bytes)
+            if err: return index, err
+            img, upload = decoded
+
+            async with vision_slots:
+                items, err = await _call_vision(img, upload, target_style)
+            if err: return index, err
+
+            async with render_lock:
+                return index, await run_in_threadpool(_render_remix, img, items)
+
+    tasks = [asyncio.create_task(run_one(i, b)) for i, b in enumerate(images)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client disconnected mid-stream: stop work nobody will read.
+        # Vision calls are async, so this aborts in-flight Gemini requests too.
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,116 @@
+import json
+import time
+import asyncio
+from core.client import REDIS_URL
+from core.logger import get_logger, ctx
+
+log = get_logger("remote_cache")
+
+# Redis is optional: without it (or without REDIS_URL) every node caches locally only.
+# The asyncio client is used so a remote round trip never blocks the event loop.
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# --- TUNING ---
+KEY_PREFIX = "verbabridge"
+SOCKET_TIMEOUT = 0.1        # seconds. A slow remote must never cost more than this per call.
+RETRY_AFTER = 30            # seconds to skip the remote tier after a failure (circuit breaker)
+DEFAULT_TTL = 30 * 24 * 3600
+
+
+class RemoteCache:
+    """
+    Shared cache tier speaking the Redis protocol (redis-server, KeyDB, Valkey...).
+
+    All I/O is async: a round trip suspends only the awaiting request, never
+    the event loop. Writes are fire-and-forget, so they add no latency at all.
+
+    Fails OPEN: any error trips a circuit breaker and the tier is skipped
+    for RETRY_AFTER seconds, so an outage degrades to local-only caching
+    instead of adding a timeout to every request.
+    """
+
+    def __init__(self, conn, namespace, ttl=DEFAULT_TTL):
+        """
+        Args:
+            conn: A redis.asyncio.Redis-compatible client (real server or in-process stand-in).
+            namespace (str): Keeps the translation / style / OCR caches apart.
+            ttl (int): Expiry in seconds for written entries (None = never).
+        """
+        self.conn = conn
+        self.namespace = namespace
+        self.ttl = ttl
+        self._down_until = 0.0
+        self._writes = set()  # Strong refs so background writes aren't garbage collected
+
+    @classmethod
+    def from_env(cls, namespace):
+        """Returns a RemoteCache if REDIS_URL is set and redis-py is installed, else None."""
+        if not REDIS_URL:
+            return None
+        if aioredis is None:
+            log.warning("⚠ REDIS_URL set but 'redis' library not found. Install with: pip install redis")
+            return None
+
+        conn = aioredis.Redis.from_url(
+            REDIS_URL,
+            socket_timeout=SOCKET_TIMEOUT,
+            socket_connect_timeout=SOCKET_TIMEOUT,
+        )
+        log.info("🌐 Remote cache tier enabled", extra=ctx(namespace=namespace))
+        return cls(conn, namespace)
+
+    # --- CIRCUIT BREAKER ---
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def _trip(self, err):
+        if self.available:
+            log.warning(f"⚠ Remote Cache Down. Local-only for {RETRY_AFTER}s.", extra=ctx(namespace=self.namespace, error=err))
+        self._down_until = time.monotonic() + RETRY_AFTER
+
+    # --- OPERATIONS ---
+
+    def _key(self, key_hash):
+        return f"{KEY_PREFIX}:{self.namespace}:{key_hash}"
+
+    async def get(self, key_hash):
+        if not self.available:
+            return None
+        try:
+            raw = await asyncio.wait_for(self.conn.get(self._key(key_hash)), SOCKET_TIMEOUT)
+        except Exception as e:
+            self._trip(e)
+            return None
+        return _decode(raw)
+
+    def set(self, key_hash, value):
+        """Schedules the write in the background and returns immediately."""
+        if not self.available:
+            return
+        task = asyncio.get_running_loop().create_task(self._write(key_hash, value))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write(self, key_hash, value):
+        try:
+            await asyncio.wait_for(
+                self.conn.set(self._key(key_hash), json.dumps(value, ensure_ascii=False), ex=self.ttl),
+                SOCKET_TIMEOUT,
+            )
+        except Exception as e:
+            self._trip(e)
+
+
+def _decode(raw):
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except Exception as e:
+        log.warning("⚠ Remote Cache Decode Error", extra=ctx(error=e))
+        return None
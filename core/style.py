@@ -1,6 +1,12 @@
 import json
+import time
+import asyncio
 from google.genai import types
-from core.client import client  # Import shared client
+from core.client import client, MODEL  # Import shared client
+from core import metrics
+from core.logger import get_logger, ctx
+
+log = get_logger("style")
 
 # --- STYLE TRANSFER PROMPT (RIZZETA SEMANTIC) ---
 STYLE_PROMPT = """
@@ -85,15 +91,26 @@ OUTPUT STRICT JSON:
 }}
 """
 
-def translate_style(text, target_style):
-    print(f"🎨 Style Transfer ({target_style}): '{text}'")
+async def translate_style(text, target_style):
+    log.info("🎨 Style Transfer", extra=ctx(style=target_style, text=text))
+    start = time.perf_counter()
     try:
-        response = client.models.generate_content(
-            model="gemini-3-flash-preview",
+        response = await client.aio.models.generate_content(
+            model=MODEL,
             contents=STYLE_PROMPT.format(text=text, style=target_style),
             config=types.GenerateContentConfig(response_mime_type="application/json")
         )
+    except asyncio.CancelledError:
+        metrics.record_upstream(MODEL, "style", latency=time.perf_counter() - start, style=target_style, input_size=len(text), cancelled=True)
+        raise
+    except Exception as e:
+        metrics.record_upstream(MODEL, "style", latency=time.perf_counter() - start, style=target_style, input_size=len(text), ok=False)
+        log.error("❌ Style Error", extra=ctx(error=e))
+        return {"error": str(e)}
+    metrics.record_upstream(MODEL, "style", response, latency=time.perf_counter() - start, style=target_style, input_size=len(text))
+
+    try:
         return json.loads(response.text)
     except Exception as e:
-        print(f"❌ Style Error: {e}")
+        log.error("❌ Style Error", extra=ctx(error=e))
         return {"error": str(e)}
\ No newline at end of file
@@ -1,6 +1,9 @@
 import re
 import unicodedata
 from taibun import Converter
+from core.logger import get_logger, ctx
+
+log = get_logger("utils")
 
 # --- CONFIGURATION ---
 # We use 'Tailo' as the base because it preserves tone marks accurately,
@@ -8,7 +11,7 @@ from taibun import Converter
 try:
     t_converter = Converter(system='Tailo', dialect='south')
 except ImportError:
-    print("⚠ Warning: 'taibun' library not found. Install with: pip install taibun")
+    log.warning("⚠ 'taibun' library not found. Install with: pip install taibun")
     t_converter = None
 
 def _get_tone_number(word_with_diacritics):
@@ -111,5 +114,5 @@ def get_hokkien_romanization(hanzi):
         # Convert to Penang Style (e.g., "Lu1 ho4")
         return penang_patch(raw_tailo)
     except Exception as e:
-        print(f"Hokkien conversion error for '{hanzi}': {e}")
+        log.warning("⚠ Hokkien conversion error", extra=ctx(hanzi=hanzi, error=e))
         return ""
\ No newline at end of file
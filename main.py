@@ -1,25 +1,78 @@
 import os
 import json
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+import time
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, File, UploadFile, Form, Request, WebSocket
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # --- MODULAR IMPORTS ---
 from core.cache import FileSystemCache
-from core.ai import generate_translations       # The Main Logic
+from core.ai import generate_translations, fill_translations, DIALECTS # The Main Logic
 from core.style import translate_style          # The "Brainrot" Engine
-from core.ocr import process_image_remix       # The "Visual Remix" Engine
+from core.ocr import process_image_remix, process_images_remix # The "Visual Remix" Engine
 from core.utils import get_hokkien_romanization # The Penang Patcher
+from core.http_cache import StaticAsset, cacheable_json # The Edge Cache Layer
+from core.logger import get_logger, ctx, request_id_var, SAMPLE_RATE # The Flight Recorder
+from core.live import LiveSession                 # The Live-Typing Session
+from core import metrics                          # The Token Accountant
 
 # --- SETUP ---
 load_dotenv()
-app = FastAPI(title="VerbaBridge Backend", version="2.0.0")
+MAX_BATCH_IMAGES = 20  # Per /process_images call
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic token/cost summary in the logs
+    summary = asyncio.create_task(metrics.summary_loop()) if metrics.SUMMARY_SECONDS > 0 else None
+    yield
+    if summary:
+        summary.cancel()
+
+app = FastAPI(title="VerbaBridge Backend", version="2.0.0", lifespan=lifespan)
 cache = FileSystemCache()
+style_cache = FileSystemCache(subdir="style")  # Keyed by _style_key()
+
+# Dashboard is read + precompressed ONCE at startup (not per request)
+try:
+    dashboard = StaticAsset("static/index.html")
+except FileNotFoundError:
+    dashboard = None
+
+log = get_logger("main")
+
+# --- MIDDLEWARE ---
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tags every log line of this request with one ID (honours an upstream X-Request-ID)."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:12]
+    token = request_id_var.set(request_id)
+    endpoint_token = metrics.endpoint_var.set(request.url.path)  # Metrics label
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        log.info("✅ Request Done", extra=ctx(
+            sample=SAMPLE_RATE,
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code,
+            ms=round((time.perf_counter() - start) * 1000, 1),
+        ))
+    finally:
+        request_id_var.reset(token)
+        metrics.endpoint_var.reset(endpoint_token)
+    response.headers["X-Request-ID"] = request_id
+    return response
 
 # --- DATA MODELS (Input Validation) ---
 class UserInput(BaseModel):
     text: str
+    dialects: Optional[List[str]] = None  # e.g., ["hokkien", "malay"]; None = all 6
 
 class StyleInput(BaseModel):
     text: str
@@ -28,64 +81,183 @@ class StyleInput(BaseModel):
 # --- ROUTES ---
 
 @app.get("/", response_class=HTMLResponse)
-async def home():
-    """Serves the Frontend Dashboard"""
-    try:
-        with open("static/index.html", "r", encoding="utf-8") as f:
-            return f.read()
-    except FileNotFoundError:
+async def home(request: Request):
+    """Serves the Frontend Dashboard (precompressed, ETag-validated)"""
+    if dashboard is None:
         return "<h1 style='color:red; font-family:sans-serif'>Error: static/index.html not found!</h1>"
+    return dashboard.response(request)
 
-# 1. CORE TRANSLATION (Text -> Culture)
-@app.post("/process_text")
-async def process_text(data: UserInput):
-    print(f"📩 Processing Text: '{data.text}'")
+# --- SHARED PIPELINES (used by both POST and cacheable GET routes) ---
+
+def _available_dialects(results):
+    """Dialects present in EVERY cached sense (a fragment missing anywhere counts as missing)."""
+    if not results:
+        return set()
+    return set.intersection(*(set(r.get("translations", {})) for r in results))
+
+def _select_dialects(results, dialects):
+    """Trims each sense down to the dialects the client asked for."""
+    return [
+        {**r, "translations": {d: r["translations"][d] for d in dialects if d in r.get("translations", {})}}
+        for r in results
+    ]
+
+def _patch_hokkien(results):
+    # Apply Penang Hokkien Patch (Logic Layer)
+    # This fixes the romanization using your 'Taibun' utility
+    for res in results:
+        try:
+            raw_hanzi = res["translations"]["hokkien"]["hanzi"]
+            # Convert Hanzi -> Penang Romanization
+            res["translations"]["hokkien"]["romanization"] = get_hokkien_romanization(raw_hanzi)
+        except KeyError:
+            pass 
+
+def _normalize_dialects(dialects):
+    """Returns (canonical dialect list, error payload or None)."""
+    dialects = [d.strip().lower() for d in dialects] if dialects else DIALECTS
+    unknown = [d for d in dialects if d not in DIALECTS]
+    if unknown:
+        return None, {"status": "error", "message": f"Unknown dialect(s): {', '.join(unknown)}. Choose from: {', '.join(DIALECTS)}"}
+    # Keep canonical order so responses (and their ETags) don't depend on request order
+    return [d for d in DIALECTS if d in dialects], None
+
+def _is_translation_cached(text, dialects=None):
+    """True if _translate_text would answer from the LOCAL cache tiers (no Gemini, no remote)."""
+    dialects, error = _normalize_dialects(dialects)
+    if error:
+        return True  # Validation error: instant too
+    cached_data = cache.peek(text)
+    if not cached_data or not cached_data.get("results"):
+        return False
+    return all(d in _available_dialects(cached_data["results"]) for d in dialects)
+
+async def _translate_text(text, dialects=None):
+    log.info("📩 Processing Text", extra=ctx(sample=SAMPLE_RATE, text=text))
+
+    dialects, error = _normalize_dialects(dialects)
+    if error:
+        return error
 
     # A. Check Cache (Speed Layer)
-    cached_data = cache.get(data.text)
-    if cached_data:
-        print("⚡ CACHE HIT")
+    cached_data = await cache.get(text)
+    if cached_data and cached_data.get("results"):
+        missing = [d for d in dialects if d not in _available_dialects(cached_data["results"])]
+        source = "cache"
+
+        # A2. Partial Hit: only fetch the missing dialect fragments, then merge
+        if missing:
+            log.info("🧩 PARTIAL CACHE HIT", extra=ctx(missing=",".join(missing)))
+            fragments = await fill_translations(text, cached_data["results"], missing)
+            # Every sense must get every missing dialect, otherwise the gap would
+            # be cached and re-fetched forever. Reject instead of merging partially.
+            complete = len(fragments) == len(cached_data["results"]) and all(
+                isinstance(f, dict) and all(d in f for d in missing) for f in fragments
+            )
+            if not complete:
+                log.warning("⚠ Incomplete dialect top-up rejected", extra=ctx(
+                    senses=len(cached_data["results"]), fragments=len(fragments), missing=",".join(missing),
+                ))
+                return {"status": "error", "message": "AI generation failed"}
+
+            new_results = [{"translations": dict(f)} for f in fragments]
+            _patch_hokkien(new_results)
+            for res, new in zip(cached_data["results"], new_results):
+                res.setdefault("translations", {}).update(
+                    {d: v for d, v in new["translations"].items() if d in missing}
+                )
+            await cache.set(text, cached_data)
+            source = "cache+gemini"
+            metrics.record_cache("partial")
+        else:
+            log.info("⚡ CACHE HIT", extra=ctx(sample=SAMPLE_RATE))
+            metrics.record_cache("hit")
+
         return {
             "status": "success", 
-            "source": "cache", 
+            "source": source, 
             "is_ambiguous": cached_data.get("is_ambiguous", False),
-            "results": cached_data.get("results", [])
+            "results": _select_dialects(cached_data["results"], dialects)
         }
 
-    # B. Ask AI (Intelligence Layer)
-    ai_data = generate_translations(data.text)
+    # B. Ask AI (Intelligence Layer) - only for the requested dialects
+    metrics.record_cache("miss")
+    ai_data = await generate_translations(text, dialects)
     
     if not ai_data or not ai_data.get("results"):
         return {"status": "error", "message": "AI generation failed"}
 
     # C. Apply Penang Hokkien Patch (Logic Layer)
-    # This fixes the romanization using your 'Taibun' utility
-    for res in ai_data["results"]:
-        try:
-            raw_hanzi = res["translations"]["hokkien"]["hanzi"]
-            # Convert Hanzi -> Penang Romanization
-            res["translations"]["hokkien"]["romanization"] = get_hokkien_romanization(raw_hanzi)
-        except KeyError:
-            pass 
+    _patch_hokkien(ai_data["results"])
 
     # D. Save to Cache (Persistence Layer)
-    cache.set(data.text, ai_data) 
+    await cache.set(text, ai_data) 
 
     return {
         "status": "success", 
         "source": "gemini", 
         "is_ambiguous": ai_data.get("is_ambiguous", False),
-        "results": ai_data["results"]
+        "results": _select_dialects(ai_data["results"], dialects)
     }
 
+def _style_key(text, style):
+    return f"{style}::{text.strip().lower()}"
+
+async def _style_text(text, style):
+    log.info("🎭 Applying Style", extra=ctx(sample=SAMPLE_RATE, style=style, text=text))
+
+    # Cached (POST, GET and live alike) so repeat requests and their ETags stay stable.
+    # The key ignores case/whitespace, so "original" is always the caller's own text.
+    cache_key = _style_key(text, style)
+    cached_data = await style_cache.get(cache_key)
+    if cached_data:
+        log.info("⚡ STYLE CACHE HIT", extra=ctx(sample=SAMPLE_RATE))
+        metrics.record_cache("hit", style)
+        return {**cached_data, "original": text}
+
+    metrics.record_cache("miss", style)
+    result = await translate_style(text, style)
+    if "error" in result:
+        return result
+    await style_cache.set(cache_key, result)
+    return {**result, "original": text}
+
+def _cacheable(request, payload):
+    """Only successful payloads get ETag/Cache-Control; errors are never cached."""
+    if payload.get("status") == "error" or "error" in payload:
+        return JSONResponse(payload, headers={"Cache-Control": "no-store"})
+    return cacheable_json(request, payload)
+
+# 1. CORE TRANSLATION (Text -> Culture)
+@app.post("/process_text")
+async def process_text(data: UserInput):
+    return await _translate_text(data.text, data.dialects)
+
+@app.get("/translate")
+async def get_translate(request: Request, text: str, dialects: Optional[str] = None):
+    """
+    Cacheable GET variant of /process_text.
+    `dialects` is comma separated (e.g. ?dialects=hokkien,malay).
+    Returns ETag + Cache-Control and honors If-None-Match (304).
+    """
+    dialect_list = [d for d in dialects.split(",") if d.strip()] if dialects else None
+    return _cacheable(request, await _translate_text(text, dialect_list))
+
 # 2. STYLE TRANSFER (Text -> Slang)
 @app.post("/translate_style")
 async def api_translate_style(data: StyleInput):
     """
     Converts standard text into a specific persona (Gen Alpha, Ah Beng, etc.)
     """
-    print(f"🎭 Applying Style [{data.style}] to: '{data.text}'")
-    return translate_style(data.text, data.style)
+    return await _style_text(data.text, data.style)
+
+@app.get("/translate_style")
+async def get_translate_style(request: Request, text: str, style: str = "Gen Alpha"):
+    """
+    Cacheable GET variant of /translate_style.
+    Returns ETag + Cache-Control and honors If-None-Match (304).
+    """
+    return _cacheable(request, await _style_text(text, style))
 
 # 3. VISUAL REMIX (Image -> Translated Overlay) 
 @app.post("/process_image")
@@ -110,5 +282,64 @@ async def api_process_image(
         return result
 
     except Exception as e:
-        print(f"❌ Server Error: {e}")
-        return JSONResponse({"error": str(e)}, status_code=500)
\ No newline at end of file
+        log.exception("❌ Server Error", extra=ctx(error=e))
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+# 4. BATCH VISUAL REMIX (Album / Meme Dump -> Streamed Overlays)
+@app.post("/process_images")
+async def api_process_images(
+    files: List[UploadFile] = File(...),
+    style: str = Form("Gen Alpha")
+):
+    """
+    Remixes many images with one style.
+    Streams NDJSON: one line per image AS IT COMPLETES (tagged with its upload
+    `index`), then a final {"done": true} line.
+    """
+    if len(files) > MAX_BATCH_IMAGES:
+        return JSONResponse({"error": f"Too many images (max {MAX_BATCH_IMAGES})"}, status_code=413)
+
+    # Read uploads now: the request body is gone once streaming starts
+    names = [f.filename for f in files]
+    images = [await f.read() for f in files]
+
+    async def stream():
+        failed = 0
+        async for index, result in process_images_remix(images, target_style=style):
+            if "error" in result:
+                failed += 1
+            yield json.dumps({"index": index, "filename": names[index], **result}, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "count": len(images), "failed": failed}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# 5. LIVE TYPING (WebSocket, debounced)
+# Runs on every keystroke, so local tiers only; the remote tier is tried once, after the debounce
+def _live_is_cached(msg):
+    if msg["mode"] == "style":
+        return style_cache.peek(_style_key(msg["text"], msg.get("style", "Gen Alpha"))) is not None
+    return _is_translation_cached(msg["text"], msg.get("dialects"))
+
+async def _live_resolve(msg):
+    if msg["mode"] == "style":
+        return await _style_text(msg["text"], msg.get("style", "Gen Alpha"))
+    return await _translate_text(msg["text"], msg.get("dialects"))
+
+@app.websocket("/ws/live")
+async def ws_live(websocket: WebSocket):
+    """
+    Live-as-you-type translation. One session per client; input is debounced
+    server-side and superseded Gemini calls are cancelled (see core/live.py).
+    """
+    request_id_var.set(websocket.headers.get("x-request-id") or uuid.uuid4().hex[:12])
+    metrics.endpoint_var.set("/ws/live")
+    await LiveSession(websocket, _live_resolve, _live_is_cached).run()
+
+# 6. METRICS (Token / Cost Accounting)
+@app.get("/metrics")
+async def api_metrics():
+    """
+    Upstream token usage, latency and retries per endpoint / call kind / style / model / input size,
+    plus cache outcomes per endpoint. Aggregated in-process since startup.
+    """
+    return metrics.snapshot()